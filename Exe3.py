@@ -1,4 +1,20 @@
 import random
+import bisect
+import os
+import time
+import threading
+import builtins
+import queue
+import weakref
+import multiprocessing
+import sqlite3
+import atexit
+import sys
+from contextlib import closing
+import difflib
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import numpy as np
@@ -9,6 +25,10 @@ class Card:
     def __init__(self, rank, suit):
         self.suit = suit
         self.rank = rank
+        # precomputed so hands and counts never re-parse the rank
+        self.points = 1 if rank == 'A' else 10 if rank in ('J', 'Q', 'K') else int(rank)
+        self.up = 11 if rank == 'A' else self.points  # up-card index into strategy tables
+        self.hilo = 1 if self.points <= 6 and rank != 'A' else -1 if self.points == 10 or rank == 'A' else 0
     def __str__(self): return f"{self.rank}{self.suit}"
 
 #---Deck---
@@ -16,38 +36,194 @@ class Deck:
     SUITS = ['♠', '♥', '♦', '♣']
     RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
 
-    def __init__(self, seed=None):
+    def __init__(self, seed=None, metrics=None, prefetch=0):
         self.rng = random.Random(seed)  # always use this RNG
         self.seed = seed
+        self.metrics = metrics
+        self.pool = None
+        if prefetch:
+            # a ShoePool process takes over self.rng and sends shuffle orders ahead of time;
+            # they are applied to one fixed set of Card objects, so a reshuffle builds nothing
+            self.template = self.new_shoe()
+            self.pool = ShoePool(self.rng, len(self.template), prefetch)
+            self._finalizer = weakref.finalize(self, self.pool.close)
         self.reset_and_shuffle()
 
+    def new_shoe(self): return [Card(rank, suit) for suit in self.SUITS for rank in self.RANKS]
+
     def reset_and_shuffle(self):
-        self.cards = [Card(rank, suit) for suit in self.SUITS for rank in self.RANKS]
-        self.rng.shuffle(self.cards)
+        if self.pool:
+            t = self.template
+            self.cards = [t[i] for i in self.pool.next()]
+        else:
+            self.cards = self.new_shoe()
+            self.rng.shuffle(self.cards)
+        self.count = 0  # Hi-Lo running count of the cards dealt from this shoe
 
     def deal_card(self):
         if len(self.cards) < 20:
             self.reset_and_shuffle()
-        return self.cards.pop(0)
+            if self.metrics: self.metrics.reshuffles += 1
+        card = self.cards.pop(0)
+        self.count += card.hilo
+        return card
+
+    def close(self):
+        if self.pool: self._finalizer()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+
+#---ShoePool---
+def _shuffle_orders(rng, n, size, buf, free, ready, stop):
+    # pool process: fills a shared ring of `size` shuffle orders of n bytes each.
+    # rng.shuffle moves elements the same way whatever the list holds, so shuffling
+    # range(n) gives the exact order the deck would have produced itself.
+    view, written = memoryview(buf).cast('B'), 0
+    while True:
+        free.acquire()
+        if stop.value: return
+        order = list(range(n))
+        rng.shuffle(order)
+        slot = written % size * n
+        view[slot:slot + n] = bytes(order)
+        written += 1
+        ready.release()
+
+
+class ShoePool:
+    # Shuffles up to `size` shoes ahead in a separate process, so the work neither runs at
+    # the reshuffle point nor competes for the GIL with the dealing thread. Orders are
+    # handed over through shared memory guarded by two semaphores, so taking a ready one
+    # costs about as much as copying 52 bytes. They come from a copy of the deck's RNG in
+    # sequence, so the cards for a seed are unchanged.
+    def __init__(self, rng, n, size=2):
+        self.n, self.size, self.read = n, size, 0
+        self.buf = multiprocessing.RawArray('B', n * size)
+        self.view = memoryview(self.buf).cast('B')
+        self.free, self.ready = multiprocessing.Semaphore(size), multiprocessing.Semaphore(0)
+        self.stop = multiprocessing.RawValue('b', 0)
+        self.process = multiprocessing.Process(target=_shuffle_orders, daemon=True,
+                                               args=(rng, n, size, self.buf, self.free, self.ready, self.stop))
+        self.process.start()
+
+    def next(self):
+        self.ready.acquire()
+        slot = self.read % self.size * self.n
+        order = bytes(self.view[slot:slot + self.n])
+        self.read += 1
+        self.free.release()
+        return order
+
+    def close(self):
+        self.stop.value = 1
+        self.free.release()  # wake the worker so it sees the stop flag
+        self.process.join(1)
+        if self.process.is_alive(): self.process.terminate()
 
 
 #---Hand---
 class Hand:
     def __init__(self):
         self.cards = []
-    def add_card(self, card): self.cards.append(card)
-    def reset(self): self.cards.clear()
-
-    def get_value(self):
-        val, aces = 0, 0
-        for card in self.cards:
-            if card.rank in ['J', 'Q', 'K']: val += 10
-            elif card.rank == 'A': val += 11; aces += 1
-            else: val += int(card.rank)
-        while val > 21 and aces: val -= 10; aces -= 1
-        return val
+        self.hard, self.aces, self.total, self.soft = 0, 0, 0, 0
+    # total/soft are kept up to date on every card so strategies can index on them directly
+    def add_card(self, card):
+        self.cards.append(card)
+        self.hard += card.points
+        self.aces += card.rank == 'A'
+        self.soft = int(self.hard <= 11 and self.aces > 0)
+        self.total = self.hard + 10 * self.soft
+    def reset(self):
+        self.cards.clear()
+        self.hard, self.aces, self.total, self.soft = 0, 0, 0, 0
+
+    def get_value(self): return self.total
     def show(self): return [str(c) for c in self.cards]
 
+#---Strategy---
+class Strategy:
+    # Precompiled policy: table[total, soft, dealer up-card, count bucket] -> 1 hit / 0 stand.
+    # Optional bets[count bucket] holds the fraction of chips to wager in that bucket.
+    SHAPE = (32, 2, 12)
+
+    def __init__(self, table, bets=None, count_edges=()):
+        table = np.array(table, dtype=np.uint8).reshape(self.SHAPE + (-1,))
+        table[22:] = 0  # never draw to a busted hand
+        if table.shape[3] != len(count_edges) + 1:
+            raise ValueError(f"table has {table.shape[3]} count buckets but count_edges define {len(count_edges) + 1}")
+        self.table = table
+        self.bets = None if bets is None else np.asarray(bets, dtype=float)
+        self.count_edges = tuple(count_edges)  # running-count boundaries between buckets
+
+    @classmethod
+    def from_rule(cls, rule, bets=None, count_edges=()):
+        buckets = len(count_edges) + 1
+        table = np.zeros(cls.SHAPE + (buckets,), dtype=np.uint8)
+        for t, s, u, b in np.ndindex(table.shape):
+            table[t, s, u, b] = bool(rule(t, s, u, b))
+        return cls(table, bets, count_edges)
+
+    @classmethod
+    def from_bytes(cls, data, bets=None, count_edges=()):
+        return cls(np.frombuffer(data, dtype=np.uint8), bets, count_edges)
+
+    def to_bytes(self): return self.table.tobytes()
+
+    def bucket(self, count): return bisect.bisect(self.count_edges, count)
+
+    # bucket for the round about to be dealt: below 20 cards the first deal reshuffles,
+    # so the round starts from a fresh shoe with a zero count
+    def deck_bucket(self, deck): return self.bucket(deck.count if len(deck.cards) >= 20 else 0)
+
+    def bet_fraction(self, bucket): return self.bets[min(bucket, len(self.bets) - 1)]
+
+
+STAND_ON_17 = Strategy.from_rule(lambda total, soft, up, bucket: total < 17)
+
+#---Betting---
+class KellyBetting:
+    # Kelly sizing from the remaining shoe. The edge for each Hi-Lo true count is calibrated
+    # once by simulation and cached, so sizing a bet is one lookup on Deck.count.
+    MAX_TC = 10
+
+    def __init__(self, edges, variance=1.0, fraction=0.5, min_bet=1, max_fraction=0.25):
+        self.edges = np.asarray(edges, dtype=float)  # edges[tc + MAX_TC] = expected return per unit bet
+        self.variance = variance
+        self.fraction, self.min_bet, self.max_fraction = fraction, min_bet, max_fraction
+
+    def true_count(self, deck):
+        left = len(deck.cards)
+        if left < 20: return 0  # the next deal reshuffles, so the round starts from a fresh shoe
+        return max(-self.MAX_TC, min(self.MAX_TC, round(deck.count * 52 / left)))
+
+    def edge(self, deck): return self.edges[self.true_count(deck) + self.MAX_TC]
+
+    def size(self, chips, deck):
+        f = self.fraction * self.edge(deck) / self.variance if deck else 0.0
+        b = int(chips * min(self.max_fraction, f))
+        return min(chips, max(self.min_bet, b))
+
+    @classmethod
+    def calibrate(cls, strategy=STAND_ON_17, dealer_strategy=STAND_ON_17, rounds=200_000, seed=0, **kwargs):
+        # Plays flat one-chip bets (bets=[0] rounds up to the minimum) and fits a least-squares
+        # line edge = a + b * tc over all rounds. Per-count cell means are too noisy (about 0.04
+        # standard error at 500 samples), but the line pools every round. With the default
+        # 200k rounds (a few seconds) the slope's standard error is about 0.0005 per true count.
+        flat = Strategy(strategy.table, bets=[0], count_edges=strategy.count_edges)
+        bot, dealer, deck = Bot('calibration', 10 ** 9, seed, flat), Dealer(dealer_strategy), Deck(seed)
+        probe = cls(np.zeros(2 * cls.MAX_TC + 1))
+        tcs, results = np.empty(rounds, dtype=int), np.empty(rounds)
+        for i in range(rounds):
+            tcs[i], before = probe.true_count(deck), bot.chips
+            play_round(deck, [bot], dealer)
+            results[i] = bot.chips - before
+        slope, intercept = np.polyfit(tcs, results, 1)
+        edges = intercept + slope * np.arange(-cls.MAX_TC, cls.MAX_TC + 1)
+        return cls(edges, results.var(), **kwargs)
+
+
 #---Player---
 class Player:
     def __init__(self, name, chips):
@@ -64,14 +240,24 @@ class Player:
 
 #---Bot---
 class Bot(Player):
-    def __init__(self, name, chips, seed):
+    def __init__(self, name, chips, seed, strategy=STAND_ON_17, betting=None):
         super().__init__(name, chips)
         self.rng = random.Random(seed)
+        self.strategy = strategy
+        self.betting = betting
     def place_random_bet(self):
         b = self.rng.randint(1, self.chips if self.chips else 1)
         self.place_bet(b)
         return b
-    def decide_move(self): return 'hit' if self.hand.get_value() < 17 else 'stand'
+    def make_bet(self, bucket=0, deck=None):
+        if self.betting: b = self.betting.size(self.chips, deck)
+        elif self.strategy.bets is None: return self.place_random_bet()
+        else: b = min(self.chips, max(1, int(self.chips * self.strategy.bet_fraction(bucket))))
+        self.place_bet(b)
+        return b
+    def decide_move(self, up=0, bucket=0):
+        h = self.hand
+        return 'hit' if self.strategy.table[h.total, h.soft, up, bucket] else 'stand'
     def rebuy(self):
         if self.chips == 0:
             self.chips = self.total_invested
@@ -81,25 +267,196 @@ class Bot(Player):
 
 #---Dealer---
 class Dealer(Player):
-    def __init__(self):
+    # The dealer reads its table at up-card 0 and bucket 0 only, so it must not depend on
+    # either axis; such a table is rejected rather than silently half-ignored.
+    def __init__(self, strategy=STAND_ON_17):
         super().__init__('Dealer', 0)
         self.hidden_card = None
+        t = strategy.table
+        if t.shape[3] != 1 or (t != t[:, :, :1]).any():
+            raise ValueError("dealer strategy may not depend on the up-card or count bucket")
+        self.strategy = strategy
     def set_hidden_card(self, card): self.hidden_card = card
     def get_hidden(self): return self.hidden_card
     def reveal_hidden_card(self):
         if self.hidden_card: self.hand.add_card(self.hidden_card)
         self.hidden_card = None
-    def should_draw(self): return self.hand.get_value() < 17
+    def should_draw(self): return bool(self.strategy.table[self.hand.total, self.hand.soft, 0, 0])
+
+#---Metrics---
+class Metrics:
+    # Live counters for tables and simulations. Hot paths only bump plain ints; the
+    # Prometheus text is rendered and written (tmp file + os.replace) at most every
+    # `interval` seconds, and the clock is only read every `check_every` rounds (or on every
+    # tick(check=True), which interactive tables use). A first snapshot is written right away.
+    def __init__(self, path=None, interval=5.0, check_every=100, seats=()):
+        self.path, self.interval, self.check_every = path, interval, check_every
+        self.seats = list(seats)  # players whose chips are exported, read only at flush time
+        self.rounds = self.hands = self.reshuffles = self.rebuys = 0
+        self.wagered = self.paid = 0
+        self.rate, self.text = 0.0, ''
+        self._last_time, self._last_rounds, self._server = time.monotonic(), 0, None
+        self.flush()
+
+    def tick(self, hands, wagered, paid, check=False):
+        self.rounds += 1
+        self.hands += hands
+        self.wagered += wagered
+        self.paid += paid
+        if (check or self.rounds % self.check_every == 0) and time.monotonic() - self._last_time >= self.interval:
+            self.flush()
+
+    def render(self):
+        edge = (self.wagered - self.paid) / self.wagered if self.wagered else 0.0
+        lines = []
+        for name, kind, value in (('rounds_total', 'counter', self.rounds),
+                                  ('rounds_per_second', 'gauge', self.rate),
+                                  ('hands_dealt_total', 'counter', self.hands),
+                                  ('reshuffles_total', 'counter', self.reshuffles),
+                                  ('bot_rebuys_total', 'counter', self.rebuys),
+                                  ('house_edge', 'gauge', edge)):
+            lines += [f"# TYPE blackjack_{name} {kind}", f"blackjack_{name} {value}"]
+        lines.append("# TYPE blackjack_seat_chips gauge")
+        for i, p in enumerate(self.seats):
+            name = p.name.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            lines.append(f'blackjack_seat_chips{{seat="{i + 1}",name="{name}"}} {p.chips}')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        now = time.monotonic()
+        if now > self._last_time:
+            self.rate = (self.rounds - self._last_rounds) / (now - self._last_time)
+        self._last_time, self._last_rounds = now, self.rounds
+        self.text = self.render()
+        if self.path:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w') as f: f.write(self.text)
+            os.replace(tmp, self.path)
+
+    def serve(self, port=9100, host='127.0.0.1'):
+        # tiny scrape endpoint serving the text of the last flush
+        metrics = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.text.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            def log_message(self, *args): pass
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        self.flush()
+        if self._server: self._server.shutdown(); self._server.server_close()
+
+
+#---Leaderboard---
+class Leaderboard:
+    # SQLite store of every finished session. record() only queues the rows; a background
+    # writer drains the queue and commits up to `batch` sessions per transaction.
+    SCHEMA = """
+        PRAGMA journal_mode=WAL;
+        CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, played_at REAL, seed INTEGER);
+        CREATE TABLE IF NOT EXISTS results (session_id INTEGER REFERENCES sessions(id), name TEXT,
+            chips, total_invested, roi REAL, rank INTEGER, is_bot INTEGER);
+        CREATE INDEX IF NOT EXISTS results_name ON results (name, session_id);
+        CREATE INDEX IF NOT EXISTS results_roi ON results (roi DESC);
+    """
+
+    def __init__(self, path="leaderboard.db", batch=1000):
+        self.path, self.batch = path, batch
+        with closing(sqlite3.connect(path)) as conn: conn.executescript(self.SCHEMA)
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    # chips and total_invested are declared without a type (no affinity): values that fit
+    # are stored as INTEGER, and ones that rebuy() doubling pushed past 64 bits are kept
+    # exactly as decimal TEXT instead of being coerced to REAL
+    @staticmethod
+    def _int(v): return v if -2 ** 63 <= v < 2 ** 63 else str(v)
+
+    @staticmethod
+    def _roi(p):
+        if not p.total_invested: return 0.0
+        try: return p.chips / p.total_invested
+        except OverflowError: return float('inf')
+
+    def record(self, seed, players, ranking):
+        rows = [(p.name, self._int(p.chips), self._int(p.total_invested),
+                 self._roi(p),
+                 ranking.get(p.name), int(isinstance(p, Bot))) for p in players]
+        self.pending.put((time.time(), seed, rows))
+
+    def _write(self):
+        conn = sqlite3.connect(self.path)
+        running = True
+        while running:
+            items = [self.pending.get()]
+            while len(items) < self.batch:
+                try: items.append(self.pending.get_nowait())
+                except queue.Empty: break
+            try:
+                with conn:
+                    for item in items:
+                        if item is None: running = False; continue
+                        played_at, seed, rows = item
+                        sid = conn.execute("INSERT INTO sessions (played_at, seed) VALUES (?, ?)",
+                                           (played_at, seed)).lastrowid
+                        conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                         [(sid,) + row for row in rows])
+            except sqlite3.Error as e:
+                # the batch was rolled back; keep the writer alive for later sessions
+                print(f"Leaderboard: dropped {len(items) - (not running)} session(s): {e}", file=sys.stderr)
+            finally:
+                for _ in items: self.pending.task_done()
+        conn.close()
+
+    def flush(self):
+        # like pending.join(), but gives up if the writer thread is gone
+        with self.pending.all_tasks_done:
+            while self.pending.unfinished_tasks and self.thread.is_alive():
+                self.pending.all_tasks_done.wait(0.1)
+
+    def close(self):
+        if self.thread.is_alive():
+            self.pending.put(None)
+            self.thread.join()
+
+    def _query(self, sql, args):
+        with closing(sqlite3.connect(self.path)) as conn: return conn.execute(sql, args).fetchall()
+
+    def top(self, n=10):
+        return self._query("SELECT name, chips, total_invested, roi, session_id FROM results "
+                           "ORDER BY roi DESC LIMIT ?", (n,))
+
+    def history(self, name):
+        return self._query("SELECT r.session_id, s.played_at, s.seed, r.chips, r.total_invested, r.roi, r.rank "
+                           "FROM results r JOIN sessions s ON s.id = r.session_id "
+                           "WHERE r.name = ? ORDER BY r.session_id", (name,))
+
 
 #---GameManager---
 class Game:
-    def __init__(self):
+    def __init__(self, bot_strategy=STAND_ON_17, dealer_strategy=STAND_ON_17, bot_betting=None, metrics=None,
+                 prefetch=0, leaderboard=None):
         self.deck = None
         self.player = None
         self.bots = []
-        self.dealer = Dealer()
+        self.bot_strategy = bot_strategy
+        self.bot_betting = bot_betting
+        self.metrics = metrics
+        self.prefetch = prefetch
+        self.leaderboard = leaderboard
+        self.dealer = Dealer(dealer_strategy)
         self.sits = []
         self.game_seed = None
+        self.summary_path = "table_summary.png"
 
     def setup(self):
         name = input("Enter your name: ")
@@ -128,7 +485,7 @@ class Game:
                 for line in bot_file:
                     if len(self.bots) >= 2: break
                     name, chips, seed = line.strip().split(',')
-                    self.bots.append(Bot(name, int(chips), int(seed)))
+                    self.bots.append(Bot(name, int(chips), int(seed), self.bot_strategy, self.bot_betting))
                     print(f"{name} now has {chips} chips.")
         except FileNotFoundError:
             print("File not found: bots.txt")
@@ -138,12 +495,19 @@ class Game:
         while True:
             try:
                 self.game_seed = int(input("Enter a seed value for the game: "))
-                self.deck = Deck(self.game_seed)
+                self.deck = Deck(self.game_seed, self.metrics, self.prefetch)
                 break
             except ValueError:
                 print("Invalid input. Please enter a valid integer.")
 
-        self.play()
+        if self.metrics:
+            self.metrics.seats = [self.player] + self.bots
+            self.metrics.flush()
+        try:
+            self.play()
+        finally:
+            self.deck.close()
+            if self.metrics: self.metrics.close()
         self.show_summary()
 
     def play(self):
@@ -196,11 +560,13 @@ class Game:
             except ValueError:
                 print("Invalid input. Please enter a valid integer.")
 
+        bucket = self.bot_strategy.deck_bucket(self.deck)
         for b in self.bots:
             if b.chips == 0:
                if b.rebuy():
+                   if self.metrics: self.metrics.rebuys += 1
                    print(f"{b.name} was out of chips and added {b.chips} more chips.")
-            print(f"{b.name} bets {b.place_random_bet()} chips and now has {b.chips} chips.")
+            print(f"{b.name} bets {b.make_bet(bucket, self.deck)} chips and now has {b.chips} chips.")
 
         for _ in range(2):
             self.player.hand.add_card(self.deck.deal_card())
@@ -226,9 +592,10 @@ class Game:
             else:
                 print("Please enter one of the following: hit, stand")
 
+        up = self.dealer.hand.cards[0].up
         for b in self.bots:
             print(f"\n{b.name}'s turn:")
-            while b.decide_move() == "hit":
+            while b.decide_move(up, bucket) == "hit":
                 card = self.deck.deal_card()
                 b.hand.add_card(card)
                 print(f"{b.name} draws: {card}")
@@ -242,7 +609,11 @@ class Game:
             self.dealer.hand.add_card(c)
             print(f"Dealer draws a: {c}")
             print(f"Dealer now has: {self.dealer.hand.show()} (value: {self.dealer.hand.get_value()})")
+        if self.metrics:
+            seats = [self.player] + self.bots
+            wagered, before = sum(p.bet for p in seats), sum(p.chips for p in seats)
         self.results()
+        if self.metrics: self.metrics.tick(len(seats) + 1, wagered, sum(p.chips for p in seats) - before, check=True)
 
     def results(self):
         dealer_value = self.dealer.hand.get_value()
@@ -296,8 +667,9 @@ class Game:
             print(f"{i + 1}. {p.name} - Chips: {p.chips}, Invested: {p.total_invested}, Return Rate: {roi[idx]:.2f}")
         seating_order = [i for i, p in enumerate(self.sits) if p is not None]
         ranking_dict = {players[idx].name: i + 1 for i, idx in enumerate(order)}
+        if self.leaderboard: self.leaderboard.record(self.game_seed, players, ranking_dict)
         self.create_table_summary(players, ranking_dict, self.player)
-        print("Table image with seating and rankings saved as 'table_summary.png'")
+        print(f"Table image with seating and rankings saved as '{self.summary_path}'")
 
     def create_table_summary(self, players, ranking, main_player):
         fig, ax = plt.subplots(figsize=(6, 6))
@@ -329,9 +701,210 @@ class Game:
             text = f"{label_name}\n#{player_rank}\n{player.chips} chips"
             ax.text(x, y + 0.005, text, ha='center', va='center', fontsize=10, color='black', weight='bold')
 
-        plt.savefig("table_summary.png", dpi=150)
+        plt.savefig(self.summary_path, dpi=150, format='png')
         plt.close()
 
 
+#---Simulation---
+def round_steps(deck, bots, dealer, metrics=None):
+    # headless Game.round for bots only: same rebuy, dealing order and settlement rules.
+    # Yields 'deal' after the opening cards and 'end' after settlement so callers can stop early.
+    for b in bots: b.reset_hand()
+    dealer.reset_hand()
+    # every bot reads the round-start count through its own strategy's buckets
+    buckets = [b.strategy.deck_bucket(deck) for b in bots]
+    for b, bucket in zip(bots, buckets):
+        if b.chips == 0 and b.rebuy() and metrics: metrics.rebuys += 1
+        b.make_bet(bucket, deck)
+    for i in range(2):
+        for b in bots: b.hand.add_card(deck.deal_card())
+        c = deck.deal_card()
+        if i == 0: dealer.hand.add_card(c)
+        else: dealer.set_hidden_card(c)
+    yield 'deal'
+    up = dealer.hand.cards[0].up
+    for b, bucket in zip(bots, buckets):
+        while b.decide_move(up, bucket) == 'hit': b.hand.add_card(deck.deal_card())
+    dealer.reveal_hidden_card()
+    while dealer.should_draw(): dealer.hand.add_card(deck.deal_card())
+    dv, dealer_bust = dealer.hand.total, dealer.has_bust()
+    wagered = paid = 0
+    for b in bots:
+        v = b.hand.total
+        win = 0 if v > 21 else b.bet * 2 if dealer_bust or v > dv else b.bet if v == dv else 0
+        b.chips += win
+        wagered += b.bet
+        paid += win
+        b.bet = 0
+    if metrics: metrics.tick(len(bots) + 1, wagered, paid)
+    yield 'end'
+
+
+def play_round(deck, bots, dealer, metrics=None):
+    for _ in round_steps(deck, bots, dealer, metrics): pass
+
+
+def session_totals(seed, make_bots, rounds, seat=0, dealer_strategy=STAND_ON_17, metrics=None):
+    # (net chips, chips wagered) for one seat; chips - total_invested is unchanged by rebuy()
+    deck, bots, dealer = Deck(seed, metrics), make_bots(seed), Dealer(dealer_strategy)
+    b = bots[seat]
+    start, wagered = b.chips - b.total_invested, 0
+    for _ in range(rounds):
+        for stage in round_steps(deck, bots, dealer, metrics):
+            if stage == 'deal': wagered += b.bet
+    return b.chips - b.total_invested - start, wagered
+
+
+def session_return(seed, make_bots, rounds, seat=0, dealer_strategy=STAND_ON_17, per_wager=True,
+                   metrics=None):
+    # net chips per chip wagered, or per round with per_wager=False
+    net, wagered = session_totals(seed, make_bots, rounds, seat, dealer_strategy, metrics)
+    return net / wagered if per_wager else net / rounds
+
+
+def _ratio(x):
+    # pooled ratio sum(net) / sum(denominator) and its per-session delta-method influence terms
+    r = x[:, 0].sum() / x[:, 1].sum()
+    return r, (x[:, 0] - r * x[:, 1]) / x[:, 1].mean()
+
+
+def estimate_return(make_bots, target=0.01, baseline=None, seat=0, rounds=100, batch=64,
+                    z=1.96, max_sessions=1_000_000, seed=0, dealer_strategy=STAND_ON_17, per_wager=True,
+                    metrics=None):
+    # make_bots(seed) -> list of Bots. Sessions are added in batches until the z-confidence
+    # half-width drops below target. The estimate is pooled, sum(net) / sum(wagered) (or per
+    # round with per_wager=False), since a mean of per-session ratios is biased when bet
+    # sizes depend on earlier results. The half-width comes from the delta method. With a
+    # baseline, both run on the same seeded shoes (common random numbers) and the estimate is
+    # the difference make_bots - baseline, with paired influence terms.
+    runs = [[], []]
+    while True:
+        for s in range(seed + len(runs[0]), seed + len(runs[0]) + batch):
+            for policy, out in ((make_bots, runs[0]), (baseline, runs[1])):
+                if policy:
+                    net, wagered = session_totals(s, policy, rounds, seat, dealer_strategy, metrics)
+                    out.append((net, wagered if per_wager else rounds))
+        est, infl = _ratio(np.array(runs[0], dtype=float))
+        if baseline:
+            base, base_infl = _ratio(np.array(runs[1], dtype=float))
+            est, infl = est - base, infl - base_infl
+        half = z * infl.std(ddof=1) / np.sqrt(len(infl))
+        if half < target or len(infl) >= max_sessions:
+            return float(est), float(half), len(infl)
+
+
+#---Seed search---
+# Predicates are called as predicate(round, stage, seats, dealer) after each 'deal' and 'end'
+# step, with seats[0] the player and seats[1:] the bots. They return True (match), False
+# (reject) or None (keep dealing). They must be picklable, so they are classes, not lambdas.
+class PlayerBlackjack:
+    def __init__(self, by_round=1): self.by_round = by_round
+    def __call__(self, r, stage, seats, dealer):
+        if stage != 'deal': return None
+        if seats[0].hand.total == 21: return True
+        return False if r + 1 >= self.by_round else None
+
+
+class BotBroke:
+    def __init__(self, bot=0, by_round=5): self.bot, self.by_round = bot, by_round
+    def __call__(self, r, stage, seats, dealer):
+        if stage != 'end': return None
+        if seats[1 + self.bot].chips == 0: return True
+        return False if r + 1 >= self.by_round else None
+
+
+def seed_matches(seed, predicate, bot_specs, rounds, player_chips=100, player_strategy=STAND_ON_17,
+                 metrics=None):
+    # the player is simulated as a flat one-chip bettor following player_strategy, which may
+    # use count buckets of its own: every seat reads the count through its own strategy
+    flat = Strategy(player_strategy.table, bets=[0], count_edges=player_strategy.count_edges)
+    seats = [Bot('player', player_chips, seed, flat)]
+    seats += [Bot(name, int(chips), int(bot_seed)) for name, chips, bot_seed in bot_specs]
+    deck, dealer = Deck(seed, metrics), Dealer()
+    for r in range(rounds):
+        for stage in round_steps(deck, seats, dealer, metrics):
+            verdict = predicate(r, stage, seats, dealer)
+            if verdict is not None: return verdict
+    return False
+
+
+def _scan(args):
+    start, stop, predicate, bot_specs, rounds, player_chips, player_strategy = args
+    return [s for s in range(start, stop)
+            if seed_matches(s, predicate, bot_specs, rounds, player_chips, player_strategy)]
+
+
+def search_seeds(predicate, start=0, stop=1_000_000, rounds=5, workers=None, chunk=10_000,
+                 limit=None, bots_file="bots.txt", player_chips=100, player_strategy=STAND_ON_17):
+    # scans [start, stop) in chunks over worker processes; returns matching seeds in order
+    with open(bots_file) as f:
+        bot_specs = [line.strip().split(',') for line in f if line.strip()][:2]
+    jobs = [(s, min(s + chunk, stop), predicate, bot_specs, rounds, player_chips, player_strategy)
+            for s in range(start, stop, chunk)]
+    found = []
+    pool = ProcessPoolExecutor(workers)
+    try:
+        for hits in pool.map(_scan, jobs):
+            found += hits
+            if limit and len(found) >= limit: return found[:limit]
+        return found
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+#---Scripted driver---
+def run_script(responses, summary_path=os.devnull, game_factory=Game):
+    # Plays one full interactive session (setup -> play -> round -> summary) with answers
+    # taken from `responses` (any iterable, e.g. a list or a generator) instead of the
+    # console. Prompts, answers and prints go to the returned transcript, not stdout.
+    # builtins are swapped for the duration, so run one script per process at a time.
+    answers, out = iter(responses), []
+
+    def scripted_input(prompt=''):
+        out.append(str(prompt))
+        try: answer = str(next(answers))
+        except StopIteration: raise EOFError("script ran out of responses") from None
+        out.append(answer + '\n')
+        return answer
+
+    def scripted_print(*args, sep=' ', end='\n', file=None, flush=False):
+        out.append(sep.join(map(str, args)) + end)
+
+    saved = builtins.input, builtins.print
+    builtins.input, builtins.print = scripted_input, scripted_print
+    try:
+        game = game_factory()
+        game.summary_path = summary_path
+        game.setup()
+    except EOFError as e:
+        out.append(f"[EOF] {e}\n")
+    finally:
+        builtins.input, builtins.print = saved
+    return ''.join(out)
+
+
+def run_scripts(scripts, workers=None, summary_path=os.devnull, game_factory=Game):
+    # scripts and game_factory must be picklable to cross into worker processes: lists of
+    # answers, and a module-level function or e.g. functools.partial(Game, prefetch=2)
+    scripts = list(scripts)
+    chunk = max(1, len(scripts) // (4 * (workers or os.cpu_count() or 1)))
+    run = functools.partial(run_script, summary_path=summary_path, game_factory=game_factory)
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(run, scripts, chunksize=chunk))
+
+
+def check_scripts(scripts, expected, workers=None, summary_path=os.devnull, game_factory=Game):
+    # returns {index: unified diff} for every session whose transcript differs from expected
+    scripts, expected = list(scripts), list(expected)
+    if len(scripts) != len(expected):
+        raise ValueError(f"{len(scripts)} scripts but {len(expected)} expected transcripts")
+    failures = {}
+    for i, (got, want) in enumerate(zip(run_scripts(scripts, workers, summary_path, game_factory), expected)):
+        if got != want:
+            failures[i] = ''.join(difflib.unified_diff(want.splitlines(True), got.splitlines(True),
+                                                       'expected', f'session {i}'))
+    return failures
+
+
 if __name__ == '__main__':
-    Game().setup()
+    Game(leaderboard=Leaderboard()).setup()